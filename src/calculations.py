@@ -1,22 +1,58 @@
 import numpy as np
-import pydicom
 from dicompylercore import dvhcalc
-# from .config import alpha_beta_ratios, constraints # No longer needed as they are passed or accessed via templates
 import os
 import contextlib
 import re
+import itertools
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from .config import get_template
 
+# Defaults used when the caller does not pass a template's own ratios or constraints
+_DEFAULT_ALPHA_BETA_RATIOS, _DEFAULT_CONSTRAINTS, _DEFAULT_POINT_DOSE_CONSTRAINTS = get_template()
+_DEFAULT_TARGET_CONSTRAINTS = _DEFAULT_CONSTRAINTS["target_constraints"]
+_DEFAULT_OAR_CONSTRAINTS = _DEFAULT_CONSTRAINTS["oar_constraints"]
+
+_BRACKET_RE = re.compile(r'\s*\[.*?\]')
+_PAREN_RE = re.compile(r'\s*\(.*?\)')
+
+@functools.lru_cache(maxsize=256)
 def normalize_structure_name(name):
     """Normalizes structure names for consistent matching."""
     # Remove content in brackets (e.g., [cm3]) or parentheses
-    name = re.sub(r'\s*\[.*?\]', '', name)
-    name = re.sub(r'\s*\(.*?\)', '', name)
+    name = _BRACKET_RE.sub('', name)
+    name = _PAREN_RE.sub('', name)
     # Convert to lowercase, strip whitespace, and then capitalize the first letter
     return name.strip().lower().capitalize()
 
-def calculate_contour_volumes(rtstruct_file, structure_data):
-    """Calculates the volume of each contour in an RTSTRUCT file."""
-    ds = pydicom.dcmread(rtstruct_file)
+def _polygon_areas(polygons):
+    """
+    Calculates the area of every closed planar polygon in a list of (N, 2) arrays (shoelace formula).
+    All polygons are concatenated so the per-edge terms are computed in one vectorized pass,
+    then summed per polygon with np.add.reduceat. Contours with fewer than 3 points have no area.
+    """
+    areas = np.zeros(len(polygons))
+    is_polygon = np.array([len(p) >= 3 for p in polygons], dtype=bool)
+    if not is_polygon.any():
+        return areas
+    # Degenerate contours are left out up front, which also keeps reduceat's segment starts distinct
+    polygons = [p for p, keep in zip(polygons, is_polygon) if keep]
+    lengths = np.array([len(p) for p in polygons])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    xy = np.concatenate(polygons)
+    x, y = xy[:, 0], xy[:, 1]
+
+    # Index of each vertex's successor; the last vertex of each polygon wraps back to its first
+    successor = np.arange(1, len(xy) + 1)
+    successor[starts + lengths - 1] = starts
+    # Trapezoid form of the shoelace sum
+    edge_terms = (x - x[successor]) * (y + y[successor])
+    areas[is_polygon] = 0.5 * np.abs(np.add.reduceat(edge_terms, starts))
+    return areas
+
+def calculate_contour_volumes(rtstruct_dataset, structure_data):
+    """Calculates the volume of each contour in an already-loaded RTSTRUCT dataset."""
+    ds = rtstruct_dataset
     volumes = {}
     for roi_contour, structure_set_roi in zip(ds.ROIContourSequence, ds.StructureSetROISequence):
         name = structure_set_roi.ROIName
@@ -24,203 +60,285 @@ def calculate_contour_volumes(rtstruct_file, structure_data):
         if not hasattr(roi_contour, 'ContourSequence') or not roi_contour.ContourSequence:
             volumes[normalized_name] = 0
             continue
-        slices_by_z = {}
+        contour_z = []
+        polygons = []
         for contour_slice in roi_contour.ContourSequence:
-            points = np.array(contour_slice.ContourData).reshape((-1, 3))
-            z = round(points[0, 2], 4)
-            if z not in slices_by_z:
-                slices_by_z[z] = []
-            slices_by_z[z].append(points[:, :2])
-        sorted_z = sorted(slices_by_z.keys())
+            contour_data = contour_slice.ContourData
+            # fromiter with a known count fills one preallocated buffer instead of going through a list
+            points = np.fromiter(contour_data, dtype=np.float64, count=len(contour_data)).reshape((-1, 3))
+            contour_z.append(round(points[0, 2], 4))
+            polygons.append(points[:, :2])
+        contour_areas = _polygon_areas(polygons)
+
+        # Sum contour areas per slice; np.unique sorts the slice positions and maps each contour to its slice
+        sorted_z, slice_index = np.unique(contour_z, return_inverse=True)
+        slice_areas = np.bincount(slice_index, weights=contour_areas, minlength=len(sorted_z))
         total_volume_mm3 = 0
         if len(sorted_z) > 1:
-            for i in range(len(sorted_z) - 1):
-                z1, z2 = sorted_z[i], sorted_z[i+1]
-                area1 = sum(0.5 * np.abs(np.dot(p[:, 0], np.roll(p[:, 1], 1)) - np.dot(p[:, 1], np.roll(p[:, 0], 1))) for p in slices_by_z[z1])
-                area2 = sum(0.5 * np.abs(np.dot(p[:, 0], np.roll(p[:, 1], 1)) - np.dot(p[:, 1], np.roll(p[:, 0], 1))) for p in slices_by_z[z2])
-                slice_thickness = abs(z1 - z2)
-                total_volume_mm3 += (area1 + area2) / 2.0 * slice_thickness
+            # Trapezoidal integration of slice area over z, using the actual spacing between slices
+            total_volume_mm3 = float(np.dot(np.diff(sorted_z), (slice_areas[:-1] + slice_areas[1:]) / 2.0))
         volumes[normalized_name] = total_volume_mm3 / 1000.0
     return volumes
 
-def get_dose_at_point(dose_grid, dose_scaling, image_position_patient, pixel_spacing, grid_frame_offset_vector, point_coordinates):
-    """Calculates the dose at a specific 3D point within the dose grid."""
-    if dose_grid is None or not point_coordinates:
-        return 0.0
+def _build_z_index(image_position_patient, grid_frame_offset_vector):
+    """
+    Returns the patient z of every dose frame sorted ascending, together with the index of each frame.
+    A GridFrameOffsetVector starting at 0 is relative to ImagePositionPatient; otherwise it holds absolute z.
+    """
+    offsets = np.asarray(grid_frame_offset_vector, dtype=np.float64)
+    frame_z = offsets + float(image_position_patient[2]) if offsets[0] == 0 else offsets
+    order = np.argsort(frame_z)
+    return frame_z[order], order.astype(np.float64)
 
-    # Extract point coordinates
-    point_x, point_y, point_z = point_coordinates
+def get_doses_at_points(dose_grid, dose_scaling, image_position_patient, pixel_spacing, grid_frame_offset_vector, points):
+    """
+    Calculates the dose at several 3D points at once by trilinear interpolation of the dose grid.
+    Points outside the grid get a dose of 0.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if dose_grid is None or len(points) == 0:
+        return np.zeros(len(points))
 
     # Extract dose grid origin and spacing
     origin_x, origin_y, origin_z = image_position_patient
     spacing_x, spacing_y = pixel_spacing
 
-    # Determine z-spacing from GridFrameOffsetVector
-    if len(grid_frame_offset_vector) > 1:
-        spacing_z = grid_frame_offset_vector[1] - grid_frame_offset_vector[0]
-    else:
-        spacing_z = 1.0 # Placeholder
-
-    # Convert patient coordinates to voxel coordinates
-    voxel_x = (point_x - origin_x) / spacing_x
-    voxel_y = (point_y - origin_y) / spacing_y
-    voxel_z = (point_z - grid_frame_offset_vector[0]) / spacing_z
-
-    # Round to nearest integer for nearest-neighbor interpolation
-    idx_x = int(round(voxel_x))
-    idx_y = int(round(voxel_y))
-    idx_z = int(round(voxel_z))
-
-    # Check for out-of-bounds
-    if not (0 <= idx_x < dose_grid.shape[2] and
-            0 <= idx_y < dose_grid.shape[1] and
-            0 <= idx_z < dose_grid.shape[0]):
-        return 0.0
+    # Frame positions can be non-uniformly spaced, so map z to a fractional frame index by interpolation
+    frame_z, frame_index = _build_z_index(image_position_patient, grid_frame_offset_vector)
+
+    # Convert patient coordinates to fractional voxel coordinates, in (z, y, x) order to match the grid
+    voxel = np.column_stack((
+        np.interp(points[:, 2], frame_z, frame_index),
+        (points[:, 1] - origin_y) / spacing_y,
+        (points[:, 0] - origin_x) / spacing_x,
+    ))
+    shape = np.array(dose_grid.shape)
+    in_bounds = np.all((voxel >= 0) & (voxel <= shape - 1), axis=1)
+    in_bounds &= (points[:, 2] >= frame_z[0]) & (points[:, 2] <= frame_z[-1])
+
+    # Lower corner of the enclosing voxel cell; clipped so the upper corner stays inside the grid
+    lower = np.clip(np.floor(voxel).astype(np.intp), 0, np.maximum(shape - 2, 0))
+    fraction = voxel - lower
+
+    doses = np.zeros(len(points))
+    for corner in itertools.product((0, 1), repeat=3):
+        index = np.minimum(lower + corner, shape - 1)
+        weight = np.prod(np.where(np.array(corner, dtype=bool), fraction, 1 - fraction), axis=1)
+        doses += weight * dose_grid[index[:, 0], index[:, 1], index[:, 2]]
 
-    # Get dose value and apply scaling
-    dose_value = dose_grid[idx_z, idx_y, idx_x] * dose_scaling
-    return dose_value
+    return np.where(in_bounds, doses * dose_scaling, 0.0)
+
+def get_dose_at_point(dose_grid, dose_scaling, image_position_patient, pixel_spacing, grid_frame_offset_vector, point_coordinates):
+    """Calculates the dose at a specific 3D point within the dose grid."""
+    if dose_grid is None or not point_coordinates:
+        return 0.0
+    return float(get_doses_at_points(dose_grid, dose_scaling, image_position_patient, pixel_spacing, grid_frame_offset_vector, [point_coordinates])[0])
 
 def calculate_d_volume(dvh, volume_cc):
     """Calculates the dose to a specific volume from a DVH object."""
     if dvh is None or dvh.volume == 0:
         return 0.0
 
-    cumulative_dvh = dvh.cumulative.counts
+    cumulative_dvh = np.asarray(dvh.cumulative.counts)
     dose_bins = dvh.bincenters
 
-    for i, vol in enumerate(cumulative_dvh):
-        if vol <= volume_cc:
-            if i == 0:
-                return dose_bins[0]
-            else:
-                x1, x2 = cumulative_dvh[i-1], cumulative_dvh[i]
-                y1, y2 = dose_bins[i-1], dose_bins[i]
-                return y1 + (volume_cc - x1) * (y2 - y1) / (x2 - x1)
-    return 0.0
+    # The cumulative DVH is non-increasing, so a binary search on its negation finds
+    # the first bin whose volume is at or below volume_cc
+    i = int(np.searchsorted(-cumulative_dvh, -volume_cc, side='left'))
+    if i == len(cumulative_dvh):
+        return 0.0
+    if i == 0:
+        return dose_bins[0]
+    x1, x2 = cumulative_dvh[i-1], cumulative_dvh[i]
+    y1, y2 = dose_bins[i-1], dose_bins[i]
+    return y1 + (volume_cc - x1) * (y2 - y1) / (x2 - x1)
+
+def _alpha_beta_and_k_factor(organ_name, alpha_beta_ratios):
+    """Returns the organ's alpha/beta ratio and its EQD2 k-factor, 1 + 2/(alpha/beta)."""
+    alpha_beta = alpha_beta_ratios.get(organ_name, alpha_beta_ratios["Default"])
+    return alpha_beta, 1 + (2 / alpha_beta)
 
 def calculate_bed_and_eqd2(total_dose, dose_per_fraction, organ_name, ebrt_dose=0, ebrt_fractions=1, previous_brachy_bed=0, alpha_beta_ratios=None):
     """Calculates BED and EQD2 for a given total dose and dose per fraction, with an optional EBRT dose."""
     if alpha_beta_ratios is None:
-        from .config import templates
-        alpha_beta_ratios = templates["Cervix HDR - EMBRACE II"]["alpha_beta_ratios"]
+        alpha_beta_ratios = _DEFAULT_ALPHA_BETA_RATIOS
 
-    alpha_beta = alpha_beta_ratios.get(organ_name, alpha_beta_ratios["Default"])
+    alpha_beta, k_factor = _alpha_beta_and_k_factor(organ_name, alpha_beta_ratios)
     
     bed_brachy = total_dose * (1 + (dose_per_fraction / alpha_beta))
-    bed_ebrt = ebrt_dose * (1 + (2 / alpha_beta))
+    bed_ebrt = ebrt_dose * k_factor
     total_bed = bed_brachy + bed_ebrt + previous_brachy_bed
-    eqd2 = total_bed / (1 + (2 / alpha_beta))
+    eqd2 = total_bed / k_factor
     
     return round(total_bed, 2), round(eqd2, 2), round(bed_brachy, 2), round(bed_ebrt, 2), round(previous_brachy_bed, 2)
 
-def calculate_dose_to_meet_constraint(eqd2_constraint, organ_name, number_of_fractions, ebrt_dose=0, previous_brachy_bed=0, alpha_beta_ratios=None):
-    """Calculates the brachytherapy dose per fraction needed to meet a specific EQD2 constraint."""
+def calculate_bed_and_eqd2_batch(dose_per_fraction, number_of_fractions, organ_names, ebrt_dose=0, previous_brachy_bed=0, alpha_beta_ratios=None):
+    """
+    Vectorized form of calculate_bed_and_eqd2 for many organs and dose metrics at once.
+    dose_per_fraction and previous_brachy_bed are (organs, metrics) arrays with one row per entry of organ_names.
+    Returns rounded (total_bed, eqd2, bed_brachy, bed_ebrt, previous_brachy_bed) arrays of the same shape.
+    Point doses work the same way, with one row per point and a single dose column.
+    """
     if alpha_beta_ratios is None:
-        from .config import templates
-        alpha_beta_ratios = templates["Cervix HDR - EMBRACE II"]["alpha_beta_ratios"]
+        alpha_beta_ratios = _DEFAULT_ALPHA_BETA_RATIOS
 
-    alpha_beta = alpha_beta_ratios.get(organ_name, alpha_beta_ratios["Default"])
-    k_factor = (1 + (2 / alpha_beta))
-    total_bed_target = eqd2_constraint * k_factor
-    bed_ebrt = ebrt_dose * k_factor
-    bed_brachy_needed = total_bed_target - bed_ebrt - previous_brachy_bed
+    dose_per_fraction = np.asarray(dose_per_fraction, dtype=np.float64)
+    default_alpha_beta = alpha_beta_ratios["Default"]
+    alpha_beta = np.array([alpha_beta_ratios.get(name, default_alpha_beta) for name in organ_names], dtype=np.float64)[:, np.newaxis]
+    k_factor = 1 + (2 / alpha_beta)
 
-    a = number_of_fractions / alpha_beta
-    b = number_of_fractions
-    c = -bed_brachy_needed
-    discriminant = b**2 - 4*a*c
+    bed_brachy = dose_per_fraction * number_of_fractions * (1 + (dose_per_fraction / alpha_beta))
+    bed_ebrt = np.broadcast_to(ebrt_dose * k_factor, dose_per_fraction.shape)
+    previous_brachy_bed = np.broadcast_to(np.asarray(previous_brachy_bed, dtype=np.float64), dose_per_fraction.shape)
+    total_bed = bed_brachy + bed_ebrt + previous_brachy_bed
+    eqd2 = total_bed / k_factor
 
-    if discriminant < 0:
-        return None
-    
-    dose_per_fraction_solution = (-b + np.sqrt(discriminant)) / (2*a)
+    return np.round(total_bed, 2), np.round(eqd2, 2), np.round(bed_brachy, 2), np.round(bed_ebrt, 2), np.round(previous_brachy_bed, 2)
 
-    if dose_per_fraction_solution < 0:
+@functools.lru_cache(maxsize=1024)
+def _solve_dose_per_fraction(bed_brachy_needed, number_of_fractions, alpha_beta):
+    """
+    Solves n*d + (n/alpha_beta)*d**2 = bed_brachy_needed for the dose per fraction d.
+    Takes only scalars so the result can be memoized; returns None when there is no non-negative solution.
+    """
+    # A negative BED budget has no non-negative root (the constraint is already exceeded)
+    if bed_brachy_needed < 0:
         return None
 
+    # Closed form of the positive root, (alpha_beta/2)*(sqrt(1 + 4*B/(n*alpha_beta)) - 1) with B = bed_brachy_needed,
+    # written as 2*(B/n)/(1 + sqrt(...)) to avoid cancellation
+    bed_per_fraction = bed_brachy_needed / number_of_fractions
+    dose_per_fraction_solution = 2 * bed_per_fraction / (1 + np.sqrt(1 + 4 * bed_per_fraction / alpha_beta))
+
     return round(dose_per_fraction_solution, 2)
 
+def calculate_dose_to_meet_constraint(eqd2_constraint, organ_name, number_of_fractions, ebrt_dose=0, previous_brachy_bed=0, alpha_beta_ratios=None):
+    """Calculates the brachytherapy dose per fraction needed to meet a specific EQD2 constraint."""
+    if alpha_beta_ratios is None:
+        alpha_beta_ratios = _DEFAULT_ALPHA_BETA_RATIOS
+
+    alpha_beta, k_factor = _alpha_beta_and_k_factor(organ_name, alpha_beta_ratios)
+    total_bed_target = eqd2_constraint * k_factor
+    bed_ebrt = ebrt_dose * k_factor
+    bed_brachy_needed = total_bed_target - bed_ebrt - previous_brachy_bed
+
+    return _solve_dose_per_fraction(bed_brachy_needed, number_of_fractions, alpha_beta)
+
 def calculate_point_dose_bed_eqd2(point_dose, number_of_fractions, organ_name, ebrt_dose=0, ebrt_fractions=1, previous_brachy_bed=0, alpha_beta_ratios=None):
     """Calculates BED and EQD2 for a given point dose."""
     if alpha_beta_ratios is None:
-        from .config import templates
-        alpha_beta_ratios = templates["Cervix HDR - EMBRACE II"]["alpha_beta_ratios"]
+        alpha_beta_ratios = _DEFAULT_ALPHA_BETA_RATIOS
 
-    alpha_beta = alpha_beta_ratios.get(organ_name, alpha_beta_ratios["Default"])
+    alpha_beta, k_factor = _alpha_beta_and_k_factor(organ_name, alpha_beta_ratios)
     total_dose = point_dose * number_of_fractions
     bed_brachy = total_dose * (1 + (point_dose / alpha_beta))
-    bed_ebrt = ebrt_dose * (1 + (2 / alpha_beta))
+    bed_ebrt = ebrt_dose * k_factor
     total_bed = bed_brachy + bed_ebrt + previous_brachy_bed
-    eqd2 = total_bed / (1 + (2 / alpha_beta))
+    eqd2 = total_bed / k_factor
     
     return round(total_bed, 2), round(eqd2, 2), round(bed_brachy, 2), round(bed_ebrt, 2), round(previous_brachy_bed, 2)
 
-def get_dvh(rtss_file, rtdose_file, structure_data, number_of_fractions, ebrt_dose=0, ebrt_fractions=1, previous_brachy_bed_per_organ=None, alpha_beta_ratios=None):
-    """Calculates the Dose-Volume Histogram (DVH) for each structure."""
+def _dvh_value(dvh, name):
+    """Returns a DVH statistic as a plain number, unwrapping DVHValue objects."""
+    value = getattr(dvh, name, 0.0)
+    return value.value if hasattr(value, 'value') else value
+
+def _doses_at_volumes(dvh, volumes, relative=False):
+    """
+    Calculates the dose received by each of several volumes in one pass over the cumulative DVH.
+    Volumes are in cc, or in percent of the structure when relative is True. Matches dicompyler-core's
+    dose_constraint (D2cc, D90, ...) for each volume, without re-deriving the DVH per statistic.
+    """
+    cumulative = dvh.cumulative
+    counts = cumulative.relative_volume.counts if relative else cumulative.absolute_volume(cumulative.volume).counts
+    volumes = np.asarray(volumes, dtype=np.float64)
+    if counts.size == 0:
+        return [0.0] * len(volumes)
+
+    nearest_bins = np.abs(counts[np.newaxis, :] - volumes[:, np.newaxis]).argmin(axis=1)
+    doses = np.where(volumes > counts.max(), 0.0, cumulative.bins[nearest_bins])
+    return doses.tolist()
+
+def _compute_structure_dvh(rtss_dataset, rtdose_dataset, roi_number):
+    """Computes the per-fraction DVH metrics for a single ROI."""
+    try:
+        dvh = dvhcalc.get_dvh(rtss_dataset, rtdose_dataset, roi_number)
+
+        # One vectorized lookup each for the absolute (cc) and relative (%) dose statistics
+        d2cc_gy_per_fraction, d1cc_gy_per_fraction = _doses_at_volumes(dvh, [2.0, 1.0])
+        d95_gy_per_fraction, d98_gy_per_fraction, d90_gy_per_fraction = _doses_at_volumes(dvh, [95.0, 98.0, 90.0], relative=True)
+        d0_1cc_gy_per_fraction = calculate_d_volume(dvh, 0.1)
+        max_dose_gy_per_fraction, mean_dose_gy_per_fraction, min_dose_gy_per_fraction = (_dvh_value(dvh, name) for name in ('max', 'mean', 'min'))
+
+    except Exception as e:
+        d2cc_gy_per_fraction, d1cc_gy_per_fraction, d0_1cc_gy_per_fraction, max_dose_gy_per_fraction, mean_dose_gy_per_fraction, min_dose_gy_per_fraction, d95_gy_per_fraction, d98_gy_per_fraction, d90_gy_per_fraction = (0.0,) * 9
+
+    return {
+        'd2cc_gy_per_fraction': d2cc_gy_per_fraction,
+        'd1cc_gy_per_fraction': d1cc_gy_per_fraction,
+        'd0_1cc_gy_per_fraction': d0_1cc_gy_per_fraction,
+        'max_dose_gy_per_fraction': max_dose_gy_per_fraction,
+        'mean_dose_gy_per_fraction': mean_dose_gy_per_fraction,
+        'min_dose_gy_per_fraction': min_dose_gy_per_fraction,
+        'd95_gy_per_fraction': d95_gy_per_fraction,
+        'd98_gy_per_fraction': d98_gy_per_fraction,
+        'd90_gy_per_fraction': d90_gy_per_fraction,
+    }
+
+def get_dvh(rtss_dataset, rtdose_dataset, structure_data, number_of_fractions, ebrt_dose=0, ebrt_fractions=1, previous_brachy_bed_per_organ=None, alpha_beta_ratios=None):
+    """
+    Calculates the Dose-Volume Histogram (DVH) for each structure.
+    Takes pydicom datasets rather than file paths so the RTSTRUCT and RTDOSE
+    are parsed once instead of once per structure. Structures are independent,
+    so their DVHs are computed on a thread pool.
+    """
     if previous_brachy_bed_per_organ is None:
         previous_brachy_bed_per_organ = {}
     dvh_results = {}
 
-    all_calculated_volumes = calculate_contour_volumes(rtss_file, structure_data)
+    all_calculated_volumes = calculate_contour_volumes(rtss_dataset, structure_data)
+
+    # Resolve each ROI's normalized name and number once, before handing the work to the pool
+    rois = [(normalize_structure_name(name), data["ROINumber"]) for name, data in structure_data.items()]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        # executor.map keeps the input order, so the report rows stay in RTSTRUCT order
+        structure_metrics = executor.map(
+            lambda roi: _compute_structure_dvh(rtss_dataset, rtdose_dataset, roi[1]),
+            rois
+        )
+        for (normalized_name, _), metrics in zip(rois, structure_metrics):
+            organ_volume_cc = all_calculated_volumes.get(normalized_name, 0.0)
+            dvh_results[normalized_name] = {
+                'volume_cc': organ_volume_cc, # *** CORRECTED KEY ***
+                **metrics,
+            }
 
-    for name, data in structure_data.items():
-        normalized_name = normalize_structure_name(name)
-        organ_volume_cc = all_calculated_volumes.get(normalized_name, 0.0)
-
-        roi_number = data["ROINumber"]
-        try:
-            dvh = dvhcalc.get_dvh(rtss_file, rtdose_file, roi_number)
-
-            d2cc_gy_per_fraction = getattr(dvh, 'D2cc', 0.0).value if hasattr(getattr(dvh, 'D2cc', 0.0), 'value') else getattr(dvh, 'D2cc', 0.0)
-            d1cc_gy_per_fraction = getattr(dvh, 'D1cc', 0.0).value if hasattr(getattr(dvh, 'D1cc', 0.0), 'value') else getattr(dvh, 'D1cc', 0.0)
-            d0_1cc_gy_per_fraction = calculate_d_volume(dvh, 0.1)
-            max_dose_gy_per_fraction = getattr(dvh, 'max', 0.0).value if hasattr(getattr(dvh, 'max', 0.0), 'value') else getattr(dvh, 'max', 0.0)
-            mean_dose_gy_per_fraction = getattr(dvh, 'mean', 0.0).value if hasattr(getattr(dvh, 'mean', 0.0), 'value') else getattr(dvh, 'mean', 0.0)
-            min_dose_gy_per_fraction = getattr(dvh, 'min', 0.0).value if hasattr(getattr(dvh, 'min', 0.0), 'value') else getattr(dvh, 'min', 0.0)
-            d95_gy_per_fraction = getattr(dvh, 'D95', 0.0).value if hasattr(getattr(dvh, 'D95', 0.0), 'value') else getattr(dvh, 'D95', 0.0)
-            d98_gy_per_fraction = getattr(dvh, 'D98', 0.0).value if hasattr(getattr(dvh, 'D98', 0.0), 'value') else getattr(dvh, 'D98', 0.0)
-            d90_gy_per_fraction = getattr(dvh, 'D90', 0.0).value if hasattr(getattr(dvh, 'D90', 0.0), 'value') else getattr(dvh, 'D90', 0.0)
-
-        except Exception as e:
-            d2cc_gy_per_fraction, d1cc_gy_per_fraction, d0_1cc_gy_per_fraction, max_dose_gy_per_fraction, mean_dose_gy_per_fraction, min_dose_gy_per_fraction, d95_gy_per_fraction, d98_gy_per_fraction, d90_gy_per_fraction = (0.0,) * 9
-            
-        dvh_results[normalized_name] = {
-            'volume_cc': organ_volume_cc, # *** CORRECTED KEY ***
-            'd2cc_gy_per_fraction': d2cc_gy_per_fraction,
-            'd1cc_gy_per_fraction': d1cc_gy_per_fraction,
-            'd0_1cc_gy_per_fraction': d0_1cc_gy_per_fraction,
-            'max_dose_gy_per_fraction': max_dose_gy_per_fraction,
-            'mean_dose_gy_per_fraction': mean_dose_gy_per_fraction,
-            'min_dose_gy_per_fraction': min_dose_gy_per_fraction,
-            'd95_gy_per_fraction': d95_gy_per_fraction,
-            'd98_gy_per_fraction': d98_gy_per_fraction,
-            'd90_gy_per_fraction': d90_gy_per_fraction,
-        }
-        
     return dvh_results
 
 def evaluate_constraints(dvh_results, point_dose_results, target_constraints=None, oar_constraints=None, point_dose_constraints=None, dose_point_mapping=None):
     """Evaluates calculated DVH and point dose results against predefined constraints."""
     if target_constraints is None:
-        from .config import templates
-        target_constraints = templates["Cervix HDR - EMBRACE II"]["constraints"]["target_constraints"]
+        target_constraints = _DEFAULT_TARGET_CONSTRAINTS
     if oar_constraints is None:
-        from .config import templates
-        oar_constraints = templates["Cervix HDR - EMBRACE II"]["constraints"]["oar_constraints"]
+        oar_constraints = _DEFAULT_OAR_CONSTRAINTS
     if point_dose_constraints is None:
-        from .config import templates
-        point_dose_constraints = templates["Cervix HDR - EMBRACE II"]["point_dose_constraints"]
+        point_dose_constraints = _DEFAULT_POINT_DOSE_CONSTRAINTS
     if dose_point_mapping is None:
         dose_point_mapping = {}
 
+    # Resolve the constraints once so each organ needs a single lookup instead of repeated membership tests
+    oar_d2cc_constraints = {name: organ_constraints["D2cc"] for name, organ_constraints in oar_constraints.items() if "D2cc" in organ_constraints}
+    hrctv_d90_constraint = target_constraints.get("Hrctv D90")
+    hrctv_d98_constraint = target_constraints.get("Hrctv D98")
+    gtv_d98_constraint = target_constraints.get("Gtv D98")
+
     constraint_evaluation = {}
     for organ, data in dvh_results.items():
         evaluation = {}
         normalized_organ = normalize_structure_name(organ)
 
-        if normalized_organ in oar_constraints and "D2cc" in oar_constraints[normalized_organ]:
-            constraint_data = oar_constraints[normalized_organ]["D2cc"]
+        constraint_data = oar_d2cc_constraints.get(normalized_organ)
+        if constraint_data is not None:
             max_eqd2 = constraint_data["max"]
             warning_eqd2 = constraint_data.get("warning")
             current_eqd2 = data["eqd2_d2cc"]
@@ -231,8 +349,8 @@ def evaluate_constraints(dvh_results, point_dose_results, target_constraints=Non
                 evaluation["EQD2_met"], evaluation["EQD2_status"] = ("False", "NOT Met")
             constraint_evaluation[normalized_organ] = evaluation
 
-        if "Hrctv D90" in target_constraints and normalized_organ == "Hrctv":
-            constraint_data = target_constraints["Hrctv D90"]
+        if hrctv_d90_constraint is not None and normalized_organ == "Hrctv":
+            constraint_data = hrctv_d90_constraint
             min_eqd2, max_eqd2 = constraint_data["min"], constraint_data.get("max")
             current_eqd2 = data["eqd2_d90"]
             evaluation.update({"EQD2_value_D90": current_eqd2, "EQD2_min_D90": min_eqd2, "EQD2_max_D90": max_eqd2})
@@ -240,8 +358,8 @@ def evaluate_constraints(dvh_results, point_dose_results, target_constraints=Non
             evaluation.update({"EQD2_met_D90": str(is_met), "EQD2_status_D90": "Met" if is_met else "NOT Met"})
             constraint_evaluation["Hrctv D90"] = evaluation
 
-        if "Hrctv D98" in target_constraints and normalized_organ == "Hrctv":
-            constraint_data = target_constraints["Hrctv D98"]
+        if hrctv_d98_constraint is not None and normalized_organ == "Hrctv":
+            constraint_data = hrctv_d98_constraint
             min_eqd2 = constraint_data["min"]
             current_eqd2 = data["eqd2_d98"]
             evaluation.update({"EQD2_value_D98": current_eqd2, "EQD2_min_D98": min_eqd2})
@@ -249,8 +367,8 @@ def evaluate_constraints(dvh_results, point_dose_results, target_constraints=Non
             evaluation.update({"EQD2_met_D98": str(is_met), "EQD2_status_D98": "Met" if is_met else "NOT Met"})
             constraint_evaluation["Hrctv D98"] = evaluation
 
-        if "Gtv D98" in target_constraints and normalized_organ == "Gtv":
-            constraint_data = target_constraints["Gtv D98"]
+        if gtv_d98_constraint is not None and normalized_organ == "Gtv":
+            constraint_data = gtv_d98_constraint
             min_eqd2 = constraint_data["min"]
             current_eqd2 = data["eqd2_d98"]
             evaluation.update({"EQD2_value_D98": current_eqd2, "EQD2_min_D98": min_eqd2})
@@ -314,16 +432,9 @@ def calculate_optimization_goal(total_eqd2_constraint, alpha_beta, ebrt_dose, eb
     # 5. Determine the allowed BED for each new fraction being planned
     bed_per_new_fraction = remaining_bed_budget / num_new_brachy_fractions
 
-    # 6. Solve the quadratic equation BED = d*(1 + d/αβ) for the physical dose 'd'
-    a = 1
-    b = alpha_beta
-    c = -alpha_beta * bed_per_new_fraction
-
-    # We use the quadratic formula and take the positive root for the dose
-    discriminant = (b**2) - (4 * a * c)
-    if discriminant < 0:
-        return 0.0
-
-    physical_dose_per_fraction = (-b + np.sqrt(discriminant)) / (2 * a)
+    # 6. Solve the quadratic equation BED = d*(1 + d/αβ) for the physical dose 'd'.
+    # Its positive root (αβ/2)*(sqrt(1 + 4*BED/αβ) - 1) is rewritten as 2*BED/(1 + sqrt(1 + 4*BED/αβ)),
+    # which avoids the cancellation of the subtraction for small BED
+    physical_dose_per_fraction = 2 * bed_per_new_fraction / (1 + np.sqrt(1 + 4 * bed_per_new_fraction / alpha_beta))
 
     return physical_dose_per_fraction
\ No newline at end of file
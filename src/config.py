@@ -1,5 +1,23 @@
 # config.py
 
+from functools import lru_cache
+from types import MappingProxyType
+
+
+def _freeze(value):
+    """Recursively wraps nested dicts in read-only MappingProxyType views."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+def thaw(value):
+    """Returns an editable deep copy (plain dicts) of a frozen template section."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
 templates = {
     "Cervix HDR - EMBRACE II": {
         "plan_type": "Cervix",
@@ -133,6 +151,19 @@ templates = {
     }
 }
 
-# Default to EMBRACE II template
-alpha_beta_ratios = templates["Cervix HDR - EMBRACE II"]["alpha_beta_ratios"]
-constraints = templates["Cervix HDR - EMBRACE II"]["constraints"]
\ No newline at end of file
+# Templates are shared by every caller (and the module-level defaults in
+# calculations), so expose them read-only; use thaw() to get an editable copy.
+templates = _freeze(templates)
+
+DEFAULT_TEMPLATE_NAME = "Cervix HDR - EMBRACE II"
+
+
+@lru_cache(maxsize=None)
+def get_template(name=DEFAULT_TEMPLATE_NAME):
+    """Returns (alpha_beta_ratios, constraints, point_dose_constraints) for a template."""
+    template = templates[name]
+    return (
+        template["alpha_beta_ratios"],
+        template["constraints"],
+        template.get("point_dose_constraints", MappingProxyType({})),
+    )
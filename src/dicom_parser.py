@@ -1,46 +1,123 @@
+import os
+import re
+import functools
+import numpy as np
 import pydicom
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Substrings of a lowercased DoseReferenceDescription that identify point types.
+# Planners add suffixes and numbering ("RV pt 1", "A_rt (5mm)"), so these are
+# substring tests rather than exact-name lookups.
+# Cylinder points: tip, shoulder, 2cm, 2.5cm, 3cm, 3.5cm.
+_CYLINDER_POINT_RE = re.compile(r'tip|shoulder|[23](?:\.5)?cm')
+# 'rv' also covers the 'rv point' and 'rv pt' spellings
+_RV_POINT_KEYWORDS = ('rv',)
+_POINT_A_KEYWORDS = ('a_rt', 'a_lt')
+
+def _iter_dicom_paths(directory):
+    """
+    Yields the path of every .dcm file under a directory.
+    Walks the tree with os.scandir so the cached DirEntry type information is
+    used instead of a stat per entry, and yields lazily so callers can stop early.
+    """
+    pending = [str(directory)]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.lower().endswith('.dcm') and entry.is_file():
+                    yield entry.path
 
 def find_dicom_file(directory):
     """Finds the first DICOM file in a directory."""
-    files = list(Path(directory).rglob("*.dcm"))
-    if files:
-        return str(files[0])
-    return None
+    return next(_iter_dicom_paths(directory), None)
+
+# Full reads pull in multi-MB PixelData (RTDOSE grids in particular); a large
+# read buffer turns pydicom's many small reads into a few big ones.
+_FULL_READ_BUFFER_SIZE = 1 << 20
+
+def _dcmread_buffered(file_path):
+    """Reads a complete DICOM file through a large buffered reader."""
+    with open(file_path, 'rb', buffering=_FULL_READ_BUFFER_SIZE) as fp:
+        return pydicom.dcmread(fp)
+
+@functools.lru_cache(maxsize=4)
+def _read_dataset(file_path, mtime_ns, size):
+    return _dcmread_buffered(file_path)
 
-def load_dicom_file(file_path):
-    """Loads a single DICOM file."""
+def read_dicom_dataset(file_path):
+    """
+    Reads a full RTPLAN file, reusing the parsed dataset while the file on disk is unchanged.
+    The RTPLAN is read by several helpers during one analysis. The cache key includes the
+    modification time and size so an edited file is parsed again. Only use this for plans:
+    the cache is process-wide, so RTDOSE/RTSTRUCT datasets would stay pinned in memory.
+    The returned dataset is shared between callers and must not be modified.
+    """
+    stat = os.stat(file_path)
+    return _read_dataset(str(file_path), stat.st_mtime_ns, stat.st_size)
+
+def _as_dataset(dicom_file):
+    """Returns the dataset for a DICOM file path, or the dataset itself if one was already loaded."""
+    if isinstance(dicom_file, pydicom.Dataset):
+        return dicom_file
+    return read_dicom_dataset(dicom_file)
+
+def load_dicom_file(file_path, specific_tags=None, stop_before_pixels=False):
+    """
+    Loads a single DICOM file.
+    Callers that only need a few elements can pass specific_tags and/or
+    stop_before_pixels so pydicom skips parsing the rest of the file.
+    """
     try:
-        return pydicom.dcmread(file_path)
+        if specific_tags is None and not stop_before_pixels:
+            return _dcmread_buffered(file_path)
+        return pydicom.dcmread(file_path, specific_tags=specific_tags, stop_before_pixels=stop_before_pixels)
     except Exception as e:
         print(f"Error loading DICOM file {file_path}: {e}")
         return None
 
 def get_dicom_files(directory):
     """Finds all DICOM files in a directory."""
-    return list(Path(directory).rglob("*.dcm"))
+    return [Path(p) for p in _iter_dicom_paths(directory)]
+
+def read_dicom_headers(dicom_files):
+    """
+    Reads only the PatientID and Modality tags of each DICOM file.
+    Returns a list of (path, dataset) pairs so the files are parsed once and
+    the headers can be shared between the consistency check and the sort.
+    The reads are I/O-bound, so they run on a thread pool; order is preserved.
+    """
+    dicom_files = list(dicom_files)
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2)) as executor:
+        datasets = executor.map(
+            lambda f: pydicom.dcmread(f, stop_before_pixels=True, specific_tags=['PatientID', 'Modality']),
+            dicom_files
+        )
+        return list(zip(dicom_files, datasets))
 
-def verify_patient_consistency(dicom_files):
+def verify_patient_consistency(dicom_headers):
     """Verifies that all DICOM files belong to the same patient."""
-    if not dicom_files:
+    if not dicom_headers:
         return True, None
 
-    first_patient_id = pydicom.dcmread(dicom_files[0]).PatientID
-    for f in dicom_files[1:]:
-        patient_id = pydicom.dcmread(f).PatientID
+    first_patient_id = dicom_headers[0][1].PatientID
+    for _, ds in dicom_headers[1:]:
+        patient_id = ds.PatientID
         if patient_id != first_patient_id:
             return False, (first_patient_id, patient_id)
     return True, first_patient_id
 
-def sort_dicom_files(dicom_files):
+def sort_dicom_files(dicom_headers):
     """Sorts DICOM files by modality (RTDOSE, RTPLAN, RTSTRUCT)."""
     sorted_files = {
         "RTDOSE": None,
         "RTPLAN": None,
         "RTSTRUCT": None,
     }
-    for f in dicom_files:
-        modality = pydicom.dcmread(f).Modality
+    for f, ds in dicom_headers:
+        modality = ds.Modality
         if modality in sorted_files:
             sorted_files[modality] = f
     return sorted_files
@@ -79,20 +156,24 @@ def get_structure_data(rtstruct_dataset):
 def get_dose_data(rtdose_file):
     """
     Safely extracts dose grid, scaling factor, and position data from an RTDOSE file.
+    The dose grid is returned already scaled to Gy as a contiguous float32 array,
+    so the reported scaling factor is 1.0 and callers need no further multiply.
     Returns None for all values if essential tags are missing or the file is invalid.
     """
     if not rtdose_file:
         return None, None, None, None, None, None
     try:
-        ds = pydicom.dcmread(rtdose_file)
+        ds = _dcmread_buffered(rtdose_file)
         
         # The most critical check: does the file contain a dose grid?
         if 'PixelData' not in ds:
             print(f"Warning: RTDOSE file {rtdose_file} is missing the PixelData tag. Cannot process dose.")
             return None, None, None, None, None, None
 
-        dose_grid = ds.pixel_array
-        dose_scaling = ds.DoseGridScaling
+        # Scale once here, straight into a float32 buffer, instead of leaving an
+        # out-of-place multiply on the full 3D grid to every caller.
+        dose_grid = np.multiply(ds.pixel_array, np.float32(ds.DoseGridScaling), dtype=np.float32)
+        dose_scaling = 1.0
         image_position = ds.ImagePositionPatient
         pixel_spacing = ds.PixelSpacing
         grid_offsets = ds.GridFrameOffsetVector
@@ -105,21 +186,17 @@ def get_dose_data(rtdose_file):
         return None, None, None, None, None, None
 
 def get_plan_data(rtplan_file):
-    """Extracts prescription data from an RTPLAN file."""
+    """Extracts prescription data from an RTPLAN file (path or already-loaded dataset)."""
     if not rtplan_file:
         return {}
-    ds = pydicom.dcmread(rtplan_file)
+    ds = _as_dataset(rtplan_file)
     plan_data = {}
 
     # Get Plan Name
-    plan_name = 'N/A'
-    if hasattr(ds, 'RTPlanLabel') and ds.RTPlanLabel:
-        plan_name = ds.RTPlanLabel
-    elif hasattr(ds, 'RTPlanName') and ds.RTPlanName:
-        plan_name = ds.RTPlanName
-    elif hasattr(ds, 'SeriesDescription') and ds.SeriesDescription:
-        plan_name = ds.SeriesDescription
-    plan_data['plan_name'] = plan_name
+    plan_data['plan_name'] = (getattr(ds, 'RTPlanLabel', None)
+                              or getattr(ds, 'RTPlanName', None)
+                              or getattr(ds, 'SeriesDescription', None)
+                              or 'N/A')
 
     # Get Plan Date and Time
     plan_data['plan_date'] = getattr(ds, 'RTPlanDate', 'N/A')
@@ -130,21 +207,25 @@ def get_plan_data(rtplan_file):
     plan_data['rakr'] = 0.0
     plan_data['source_strength_ref_date'] = 'N/A'
     plan_data['source_strength_ref_time'] = 'N/A'
-    if hasattr(ds, 'SourceSequence') and len(ds.SourceSequence) > 0:
-        source = ds.SourceSequence[0]
-        if hasattr(source, 'ReferenceAirKermaRate'):
-            rakr = float(source.ReferenceAirKermaRate)
+    source_sequence = getattr(ds, 'SourceSequence', None)
+    if source_sequence:
+        source = source_sequence[0]
+        rakr = getattr(source, 'ReferenceAirKermaRate', None)
+        if rakr is not None:
+            rakr = float(rakr)
             plan_data['source_info'] = f"{rakr:.2f} cGy cm^2/hr"
             plan_data['rakr'] = rakr
         plan_data['source_strength_ref_date'] = getattr(source, 'SourceStrengthReferenceDate', 'N/A')
         plan_data['source_strength_ref_time'] = getattr(source, 'SourceStrengthReferenceTime', 'N/A')
 
     # Get Number of Fractions and Dose per Fraction
-    if hasattr(ds, 'FractionGroupSequence') and len(ds.FractionGroupSequence) > 0:
-        fraction_group = ds.FractionGroupSequence[0]
+    fraction_group_sequence = getattr(ds, 'FractionGroupSequence', None)
+    if fraction_group_sequence:
+        fraction_group = fraction_group_sequence[0]
         plan_data['number_of_fractions'] = int(getattr(fraction_group, 'NumberOfFractionsPlanned', 1))
-        if hasattr(fraction_group, 'ReferencedBrachyApplicationSetupSequence') and len(fraction_group.ReferencedBrachyApplicationSetupSequence) > 0:
-            brachy_setup = fraction_group.ReferencedBrachyApplicationSetupSequence[0]
+        ref_setup_sequence = getattr(fraction_group, 'ReferencedBrachyApplicationSetupSequence', None)
+        if ref_setup_sequence:
+            brachy_setup = ref_setup_sequence[0]
             plan_data['brachy_dose_per_fraction'] = float(getattr(brachy_setup, 'BrachyApplicationSetupDose', 0.0))
         else:
             plan_data['brachy_dose_per_fraction'] = 0.0
@@ -152,12 +233,19 @@ def get_plan_data(rtplan_file):
         plan_data['number_of_fractions'] = 1
         plan_data['brachy_dose_per_fraction'] = 0.0
 
-    # Get Dose Reference Data
+    # Get Dose Reference Data, and the Prescription Points for Cylinder Plans,
+    # in a single pass over the DoseReferenceSequence
     plan_data['dose_references'] = []
-    if hasattr(ds, 'DoseReferenceSequence'):
+    plan_data['prescription_points'] = []
+    app_setup_sequence = getattr(ds, 'BrachyApplicationSetupSequence', None)
+    is_cylinder_plan = bool(app_setup_sequence) and \
+        getattr(app_setup_sequence[0], 'ApplicationSetupType', '') == 'VAGINAL'
+    dose_reference_sequence = getattr(ds, 'DoseReferenceSequence', None)
+    if dose_reference_sequence is not None:
         unnamed_point_counter = 1
-        for dr in ds.DoseReferenceSequence:
-            point_name = getattr(dr, 'DoseReferenceDescription', '').strip()
+        for dr in dose_reference_sequence:
+            description = getattr(dr, 'DoseReferenceDescription', '')
+            point_name = description.strip()
             if not point_name or point_name == '-':
                 point_name = f"Unnamed Point {unnamed_point_counter}"
                 unnamed_point_counter += 1
@@ -167,26 +255,22 @@ def get_plan_data(rtplan_file):
                 'dose': dr.TargetPrescriptionDose
             })
 
-    # Get Prescription Points for Cylinder Plans
-    plan_data['prescription_points'] = []
-    if hasattr(ds, 'BrachyApplicationSetupSequence') and len(ds.BrachyApplicationSetupSequence) > 0:
-        if getattr(ds.BrachyApplicationSetupSequence[0], 'ApplicationSetupType', '') == 'VAGINAL':
-            if hasattr(ds, 'DoseReferenceSequence'):
-                for dr in ds.DoseReferenceSequence:
-                    point_name = dr.DoseReferenceDescription.lower()
-                    if any(name in point_name for name in ['tip', 'shoulder', '3cm', '3.5cm', '2cm', '2.5cm']):
-                        plan_data['prescription_points'].append({
-                            'name': dr.DoseReferenceDescription,
-                            'coordinates': dr.DoseReferencePointCoordinates
-                        })
+            if is_cylinder_plan:
+                lower_description = description.lower()
+                if _CYLINDER_POINT_RE.search(lower_description):
+                    plan_data['prescription_points'].append({
+                        'name': description,
+                        'coordinates': dr.DoseReferencePointCoordinates
+                    })
 
     # Get Channel Mapping Data
     plan_data['channel_mapping'] = []
     brachy_app_setup_sequence = ds.get((0x300a, 0x0230))
     if brachy_app_setup_sequence:
         for app_setup in brachy_app_setup_sequence:
-            if hasattr(app_setup, 'ChannelSequence'):
-                for channel_item in app_setup.ChannelSequence:
+            channel_sequence = getattr(app_setup, 'ChannelSequence', None)
+            if channel_sequence is not None:
+                for channel_item in channel_sequence:
                     channel_info = {
                         'channel_number': getattr(channel_item, 'ChannelNumber', 'N/A'),
                         'source_applicator_id': getattr(channel_item, 'SourceApplicatorID', 'N/A'),
@@ -204,68 +288,68 @@ def get_dose_point_mapping(rtplan_file, point_dose_constraints):
     """
     Parses the RTPLAN file to find dose reference points and maps them to the
     point dose constraints based on naming conventions.
+    rtplan_file may be a path or an already-loaded dataset.
     """
-    ds = pydicom.dcmread(rtplan_file)
+    ds = _as_dataset(rtplan_file)
     mapping = {}
 
     if "DoseReferenceSequence" not in ds:
         return mapping
 
+    # Lowercase the constraint names once rather than per dose reference;
+    # the first constraint wins on a case-insensitive name collision.
+    lc_constraints = {}
+    for constraint_name in point_dose_constraints:
+        lc_constraints.setdefault(constraint_name.lower(), constraint_name)
+
     for dose_ref in ds.DoseReferenceSequence:
         if "DoseReferenceDescription" in dose_ref:
-            dicom_point_name = dose_ref.DoseReferenceDescription.lower()
-            
-            cylinder_point_keywords = ['tip', 'shoulder', '3cm', '3.5cm', '2cm', '2.5cm']
-            if any(keyword in dicom_point_name for keyword in cylinder_point_keywords):
-                mapping[dose_ref.DoseReferenceDescription] = "Prescription Point"
+            description = dose_ref.DoseReferenceDescription
+            dicom_point_name = description.lower()
+
+            if _CYLINDER_POINT_RE.search(dicom_point_name):
+                mapping[description] = "Prescription Point"
                 continue
 
-            rv_point_keywords = ['rv', 'rv point', 'rv pt']
-            if any(keyword in dicom_point_name for keyword in rv_point_keywords):
-                mapping[dose_ref.DoseReferenceDescription] = "RV Point"
+            if any(keyword in dicom_point_name for keyword in _RV_POINT_KEYWORDS):
+                mapping[description] = "RV Point"
                 continue
 
             # Check for Point A variations
-            point_a_keywords = ['a_rt', 'a_lt']
-            if any(keyword in dicom_point_name for keyword in point_a_keywords):
-                mapping[dose_ref.DoseReferenceDescription] = "Point A"
+            if any(keyword in dicom_point_name for keyword in _POINT_A_KEYWORDS):
+                mapping[description] = "Point A"
                 continue
 
-            exact_match_found = False
-            for constraint_name in point_dose_constraints.keys():
-                if dicom_point_name == constraint_name.lower():
-                    mapping[dose_ref.DoseReferenceDescription] = constraint_name
-                    exact_match_found = True
-                    break
-            
-            if not exact_match_found:
-                for constraint_name in point_dose_constraints.keys():
-                    if constraint_name.lower() in dicom_point_name:
-                        mapping[dose_ref.DoseReferenceDescription] = constraint_name
-                        break
+            constraint_name = lc_constraints.get(dicom_point_name)
+            if constraint_name is None:
+                constraint_name = next(
+                    (name for lc_name, name in lc_constraints.items() if lc_name in dicom_point_name),
+                    None,
+                )
+            if constraint_name is not None:
+                mapping[description] = constraint_name
     return mapping
 
 def get_control_point_data(rtplan_file):
-    """Extracts control point data from an RTPLAN file."""
+    """Extracts control point data from an RTPLAN file (path or already-loaded dataset)."""
     if not rtplan_file:
         return []
-    ds = pydicom.dcmread(rtplan_file)
+    ds = _as_dataset(rtplan_file)
     control_points = []
-    if hasattr(ds, 'BrachyApplicationSetupSequence'):
-        for app_setup in ds.BrachyApplicationSetupSequence:
-            if hasattr(app_setup, 'BrachyControlPointSequence'):
-                for cp in app_setup.BrachyControlPointSequence:
-                    control_points.append({
-                        'position': cp.ControlPoint3DPosition,
-                        'dose': cp.ControlPointCumulativeTimeWeight
-                    })
+    for app_setup in getattr(ds, 'BrachyApplicationSetupSequence', None) or ():
+        for cp in getattr(app_setup, 'BrachyControlPointSequence', None) or ():
+            control_points.append({
+                'position': cp.ControlPoint3DPosition,
+                'dose': cp.ControlPointCumulativeTimeWeight
+            })
     return control_points
 
 def get_dwell_times_and_positions(rtplan_file):
     """
     Calculates the dwell times and positions from a DICOM RT Plan file.
+    rtplan_file may be a path or an already-loaded dataset.
     """
-    plan = pydicom.dcmread(rtplan_file)
+    plan = _as_dataset(rtplan_file)
     dwell_data = []
 
     brachy_app_setup_sequence = plan.get((0x300a, 0x0230))
@@ -280,12 +364,17 @@ def get_dwell_times_and_positions(rtplan_file):
             continue
 
         control_points = channel.BrachyControlPointSequence
-        
-        for i in range(1, len(control_points)):
-            dwell_time_weight = float(control_points[i].CumulativeTimeWeight) - float(control_points[i-1].CumulativeTimeWeight)
-            
-            if dwell_time_weight > 0:
-                dwell_time = dwell_time_weight * channel_total_time / final_cumulative_time_weight
-                position = float(control_points[i].ControlPointRelativePosition)
-                dwell_data.append({"position": position, "dwell_time": dwell_time})
+        cumulative_weights = np.fromiter(
+            (float(cp.CumulativeTimeWeight) for cp in control_points),
+            dtype=np.float64, count=len(control_points)
+        )
+        # The source dwells at control point i for the weight accumulated since point i-1
+        dwell_time_weights = np.diff(cumulative_weights)
+        dwell_indices = np.flatnonzero(dwell_time_weights > 0)
+        dwell_times = dwell_time_weights[dwell_indices] * channel_total_time / final_cumulative_time_weight
+
+        dwell_data.extend(
+            {"position": float(control_points[i + 1].ControlPointRelativePosition), "dwell_time": dwell_time}
+            for i, dwell_time in zip(dwell_indices.tolist(), dwell_times.tolist())
+        )
     return dwell_data
\ No newline at end of file
@@ -5,7 +5,7 @@ def parse_html_report(file_path):
     eqd2_results = {}
     try:
         with open(file_path, 'r') as f:
-            soup = BeautifulSoup(f, 'html.parser')
+            soup = BeautifulSoup(f, 'lxml')
 
         # Find the DVH results table
         table = soup.find('h2', string='Dose Volume Histogram (DVH) Results').find_next_sibling('table')
@@ -14,7 +14,7 @@ def parse_html_report(file_path):
             return eqd2_results
 
         # Find the headers to get column indices
-        headers = [th.get_text(strip=True) for th in table.find('thead').find_all('th')]
+        headers = [th.get_text(strip=True) for th in table.select('thead th')]
         
         organ_col_idx = -1
         eqd2_col_idx = -1
@@ -26,7 +26,7 @@ def parse_html_report(file_path):
             return eqd2_results
 
         # Extract data from table rows
-        for row in table.find('tbody').find_all('tr'):
+        for row in table.select('tbody > tr'):
             cols = row.find_all('td')
             if len(cols) > max(organ_col_idx, eqd2_col_idx):
                 organ_name = cols[organ_col_idx].get_text(strip=True)
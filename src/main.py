@@ -2,17 +2,101 @@ import sys
 import base64
 import pandas as pd
 from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from openpyxl import load_workbook
-import pydicom
 from .html_parser import parse_html_report
-from .dicom_parser import find_dicom_file, load_dicom_file, get_structure_data, get_plan_data, get_dwell_times_and_positions, get_dose_data
-from .calculations import get_dvh, evaluate_constraints, calculate_dose_to_meet_constraint, calculate_point_dose_bed_eqd2, get_dose_at_point, check_plan_time, calculate_bed_and_eqd2
+from .dicom_parser import find_dicom_file, load_dicom_file, read_dicom_dataset, get_structure_data, get_plan_data, get_dwell_times_and_positions, get_dose_data
+from .calculations import get_dvh, evaluate_constraints, calculate_dose_to_meet_constraint, get_dose_at_point, check_plan_time, calculate_bed_and_eqd2_batch
+from .config import get_template
 import argparse
 from pathlib import Path
 import json
 import os
+import re
+import functools
 import pdfkit
 
+# Matches the {{ placeholder }} fields in report_template.html
+_TEMPLATE_PLACEHOLDER_RE = re.compile(r'\{\{ (\w+) \}\}')
+# Matches var(--name) references in the report CSS
+_CSS_VARIABLE_RE = re.compile(r'var\((--[\w-]+)\)')
+
+# DVH metrics shown per structure in the report tables
+_TARGET_METRICS = (
+    {'name': 'D98', 'dose_key': 'd98_gy_per_fraction', 'eqd2_key': 'eqd2_d98'},
+    {'name': 'D90', 'dose_key': 'd90_gy_per_fraction', 'eqd2_key': 'eqd2_d90'},
+)
+_OAR_METRICS = (
+    {'name': 'D0.1cc', 'dose_key': 'd0_1cc_gy_per_fraction', 'eqd2_key': 'eqd2_d0_1cc'},
+    {'name': 'D1cc', 'dose_key': 'd1cc_gy_per_fraction', 'eqd2_key': 'eqd2_d1cc'},
+    {'name': 'D2cc', 'dose_key': 'd2cc_gy_per_fraction', 'eqd2_key': 'eqd2_d2cc'},
+)
+# The first metric row of a structure carries the rowspan cells with the structure info
+_FIRST_METRIC_ROW = (
+    '<tr>'
+    '<td rowspan="{rowspan}">{organ}</td>'
+    '<td rowspan="{rowspan}">{alpha_beta}</td>'
+    '<td rowspan="{rowspan}">{volume_cc}</td>'
+    '<td>{metric_name}</td>'
+    '{fx_doses_html}'
+    '<td>{eqd2_val:.2f}</td>'
+    '</tr>'
+)
+_METRIC_ROW = (
+    '<tr>'
+    '<td>{metric_name}</td>'
+    '{fx_doses_html}'
+    '<td>{eqd2_val:.2f}</td>'
+    '</tr>'
+)
+
+@functools.lru_cache(maxsize=4)
+def _read_report_template(template_path):
+    """Reads the report template once per process."""
+    with open(template_path, "r") as f:
+        return f.read()
+
+@functools.lru_cache(maxsize=4)
+def _read_logo_data_uri(logo_path):
+    """Returns the report logo as a base64 data URI, or an empty string if it is missing."""
+    try:
+        with open(logo_path, "rb") as img_file:
+            logo_base64 = base64.b64encode(img_file.read()).decode('utf-8')
+            return f"data:image/png;base64,{logo_base64}"
+    except FileNotFoundError:
+        return ""
+
+def _dvh_metric_rows(organ, data, alpha_beta, volume_cc, metrics, number_of_fractions, previous_brachy_data):
+    """Builds the report table rows for one structure, one row per DVH metric."""
+    prev_doses = {}
+    if previous_brachy_data and isinstance(previous_brachy_data, dict):
+        prev_doses = previous_brachy_data.get("dvh_results", {}).get(organ, {}).get("dose_fx", {})
+
+    rows = []
+    for i, metric in enumerate(metrics):
+        fx_dose_cells = []
+        # Get previous fractional doses
+        dose_list = prev_doses.get(metric['dose_key'], [])
+        if isinstance(dose_list, list):
+            fx_dose_cells.extend(f"<td>{dose:.2f}</td>" for dose in dose_list)
+
+        # Add current fractional doses
+        current_dose = data.get(metric['dose_key'], 0)
+        fx_dose_cells.append(f'<td>{current_dose:.2f}</td>' * number_of_fractions)
+
+        row_format = _FIRST_METRIC_ROW if i == 0 else _METRIC_ROW
+        rows.append(row_format.format(
+            rowspan=len(metrics),
+            organ=organ,
+            alpha_beta=alpha_beta,
+            volume_cc=volume_cc,
+            metric_name=metric["name"],
+            fx_doses_html="".join(fx_dose_cells),
+            eqd2_val=data.get(metric['eqd2_key'], 0),
+        ))
+    return rows
+
 def replace_css_variables(html_content):
     """Replaces CSS variables with their actual values for PDF generation."""
     colors = {
@@ -31,9 +115,8 @@ def replace_css_variables(html_content):
         '--warning-bg': '#fdfd96',
         '--warning-text': 'black',
     }
-    for var, value in colors.items():
-        html_content = html_content.replace(f'var({var})', value)
-    return html_content
+    # One pass over the document instead of one full copy per variable
+    return _CSS_VARIABLE_RE.sub(lambda m: colors.get(m.group(1), m.group(0)), html_content)
 
 def convert_html_to_pdf(html_content, output_path):
     """
@@ -81,15 +164,8 @@ def generate_html_report(patient_name, patient_mrn, plan_name, plan_date, plan_t
     template_path = base_path / "templates" / "report_template.html"
     logo_path = base_path / "assets" / "2020-flame-red-02.PNG"
 
-    with open(template_path, "r") as f:
-        template = f.read()
-
-    try:
-        with open(logo_path, "rb") as img_file:
-            logo_base64 = base64.b64encode(img_file.read()).decode('utf-8')
-            logo_data_uri = f"data:image/png;base64,{logo_base64}"
-    except FileNotFoundError:
-        logo_data_uri = ""
+    template = _read_report_template(template_path)
+    logo_data_uri = _read_logo_data_uri(logo_path)
 
     # --- MODIFICATION START: New report generation logic ---
     
@@ -113,12 +189,13 @@ def generate_html_report(patient_name, patient_mrn, plan_name, plan_date, plan_t
     total_fractions = previous_fractions + number_of_fractions
     fraction_headers = "".join([f"<th>Fx {i+1} Dose (Gy)</th>" for i in range(total_fractions)])
 
-    target_volume_rows = ""
-    oar_rows = ""
+    target_volume_rows = []
+    oar_rows = []
+    default_alpha_beta = alpha_beta_ratios["Default"]
 
     # Loop through DVH results to build HTML strings for tables
     for organ, data in dvh_results.items():
-        alpha_beta = alpha_beta_ratios.get(organ, alpha_beta_ratios["Default"])
+        alpha_beta = alpha_beta_ratios.get(organ, default_alpha_beta)
         volume_cc = data.get("volume_cc", "N/A")
         if isinstance(volume_cc, (int, float)):
             volume_cc = f"{volume_cc:.2f}"
@@ -127,108 +204,27 @@ def generate_html_report(patient_name, patient_mrn, plan_name, plan_date, plan_t
         is_target = alpha_beta == 10
 
         if is_target:
-            metrics = [
-                {'name': 'D98', 'dose_key': 'd98_gy_per_fraction', 'eqd2_key': 'eqd2_d98'},
-                {'name': 'D90', 'dose_key': 'd90_gy_per_fraction', 'eqd2_key': 'eqd2_d90'}
-            ]
-            
-            html_rows_for_organ = []
-            for i, metric in enumerate(metrics):
-                fx_doses_html = ""
-                # Get previous fractional doses
-                if previous_brachy_data and isinstance(previous_brachy_data, dict):
-                    prev_doses = previous_brachy_data.get("dvh_results", {}).get(organ, {}).get("dose_fx", {})
-                    dose_list = prev_doses.get(metric['dose_key'], [])
-                    if isinstance(dose_list, list):
-                        fx_doses_html += "".join([f"<td>{dose:.2f}</td>" for dose in dose_list])
-
-                # Add current fractional doses
-                current_dose = data.get(metric['dose_key'], 0)
-                fx_doses_html += f'<td>{current_dose:.2f}</td>' * number_of_fractions
-                
-                eqd2_val = data.get(metric['eqd2_key'], 0)
-                
-                # First row gets the rowspan and organ info
-                if i == 0:
-                    html_rows_for_organ.append(
-                        f'<tr>'
-                        f'<td rowspan="{len(metrics)}">{organ}</td>'
-                        f'<td rowspan="{len(metrics)}">{alpha_beta}</td>'
-                        f'<td rowspan="{len(metrics)}">{volume_cc}</td>'
-                        f'<td>{metric["name"]}</td>'
-                        f'{fx_doses_html}'
-                        f'<td>{eqd2_val:.2f}</td>'
-                        f'</tr>'
-                    )
-                else:
-                    html_rows_for_organ.append(
-                        f'<tr>'
-                        f'<td>{metric["name"]}</td>'
-                        f'{fx_doses_html}'
-                        f'<td>{eqd2_val:.2f}</td>'
-                        f'</tr>'
-                    )
-            target_volume_rows += "".join(html_rows_for_organ)
-            
+            target_volume_rows.extend(_dvh_metric_rows(organ, data, alpha_beta, volume_cc, _TARGET_METRICS, number_of_fractions, previous_brachy_data))
         else:  # OAR
-            metrics = [
-                {'name': 'D0.1cc', 'dose_key': 'd0_1cc_gy_per_fraction', 'eqd2_key': 'eqd2_d0_1cc'},
-                {'name': 'D1cc', 'dose_key': 'd1cc_gy_per_fraction', 'eqd2_key': 'eqd2_d1cc'},
-                {'name': 'D2cc', 'dose_key': 'd2cc_gy_per_fraction', 'eqd2_key': 'eqd2_d2cc'}
-            ]
-
-            html_rows_for_organ = []
-            for i, metric in enumerate(metrics):
-                fx_doses_html = ""
-                if previous_brachy_data and isinstance(previous_brachy_data, dict):
-                    prev_doses = previous_brachy_data.get("dvh_results", {}).get(organ, {}).get("dose_fx", {})
-                    dose_list = prev_doses.get(metric['dose_key'], [])
-                    if isinstance(dose_list, list):
-                        fx_doses_html += "".join([f"<td>{dose:.2f}</td>" for dose in dose_list])
-                
-                current_dose = data.get(metric['dose_key'], 0)
-                fx_doses_html += f'<td>{current_dose:.2f}</td>' * number_of_fractions
-                
-                eqd2_val = data.get(metric['eqd2_key'], 0)
-
-                if i == 0:
-                    html_rows_for_organ.append(
-                        f'<tr>'
-                        f'<td rowspan="{len(metrics)}">{organ}</td>'
-                        f'<td rowspan="{len(metrics)}">{alpha_beta}</td>'
-                        f'<td rowspan="{len(metrics)}">{volume_cc}</td>'
-                        f'<td>{metric["name"]}</td>'
-                        f'{fx_doses_html}'
-                        f'<td>{eqd2_val:.2f}</td>'
-                        f'</tr>'
-                    )
-                else:
-                    html_rows_for_organ.append(
-                        f'<tr>'
-                        f'<td>{metric["name"]}</td>'
-                        f'{fx_doses_html}'
-                        f'<td>{eqd2_val:.2f}</td>'
-                        f'</tr>'
-                    )
-            oar_rows += "".join(html_rows_for_organ)
+            oar_rows.extend(_dvh_metric_rows(organ, data, alpha_beta, volume_cc, _OAR_METRICS, number_of_fractions, previous_brachy_data))
 
     # Point Dose Results
-    point_dose_rows = ""
+    point_dose_rows = []
     for pr in point_dose_results:
-        point_fraction_cells = ""
+        fraction_cells = []
         # Get previous fractional doses
         if previous_brachy_data and isinstance(previous_brachy_data, dict):
             prev_doses_list = previous_brachy_data.get("point_dose_results", {}).get(pr.get('name', ''), [])
             if isinstance(prev_doses_list, list):
-                for dose in prev_doses_list:
-                    point_fraction_cells += f"<td>{dose:.2f}</td>"
+                fraction_cells.extend(f"<td>{dose:.2f}</td>" for dose in prev_doses_list)
         
         # Add current fractional doses
-        point_fraction_cells += f'<td>{pr.get("dose", 0):.2f}</td>' * number_of_fractions
+        fraction_cells.append(f'<td>{pr.get("dose", 0):.2f}</td>' * number_of_fractions)
+        point_fraction_cells = "".join(fraction_cells)
         
-        point_alpha_beta = alpha_beta_ratios.get(pr.get('name', 'Default'), alpha_beta_ratios["Default"])
+        point_alpha_beta = alpha_beta_ratios.get(pr.get('name', 'Default'), default_alpha_beta)
         
-        point_dose_rows += (
+        point_dose_rows.append(
             f'<tr>'
             f'<td>{pr.get("name", "N/A")}</td>'
             f'<td>{point_alpha_beta}</td>'
@@ -238,21 +234,25 @@ def generate_html_report(patient_name, patient_mrn, plan_name, plan_date, plan_t
         )
     # --- MODIFICATION END ---
 
-    html_content = template.replace("{{ patient_name }}", patient_name)
-    html_content = html_content.replace("{{ patient_mrn }}", patient_mrn)
-    html_content = html_content.replace("{{ plan_name }}", plan_name)
-    html_content = html_content.replace("{{ plan_date }}", plan_date)
-    html_content = html_content.replace("{{ plan_time }}", plan_time)
-    html_content = html_content.replace("{{ source_info }}", source_info)
-    html_content = html_content.replace("{{ brachy_dose_per_fraction }}", str(brachy_dose_per_fraction))
-    html_content = html_content.replace("{{ number_of_fractions }}", str(number_of_fractions))
-    html_content = html_content.replace("{{ ebrt_dose }}", str(ebrt_dose))
-    html_content = html_content.replace("{{ ebrt_fractions }}", str(ebrt_fractions))
-    html_content = html_content.replace("{{ target_volume_rows }}", target_volume_rows)
-    html_content = html_content.replace("{{ oar_rows }}", oar_rows)
-    html_content = html_content.replace("{{ logo_base64 }}", logo_data_uri)
-    html_content = html_content.replace("{{ fraction_headers }}", fraction_headers)
-    html_content = html_content.replace("{{ point_dose_rows }}", point_dose_rows)
+    context = {
+        "patient_name": patient_name,
+        "patient_mrn": patient_mrn,
+        "plan_name": plan_name,
+        "plan_date": plan_date,
+        "plan_time": plan_time,
+        "source_info": source_info,
+        "brachy_dose_per_fraction": str(brachy_dose_per_fraction),
+        "number_of_fractions": str(number_of_fractions),
+        "ebrt_dose": str(ebrt_dose),
+        "ebrt_fractions": str(ebrt_fractions),
+        "target_volume_rows": "".join(target_volume_rows),
+        "oar_rows": "".join(oar_rows),
+        "logo_base64": logo_data_uri,
+        "fraction_headers": fraction_headers,
+        "point_dose_rows": "".join(point_dose_rows),
+    }
+    # Fill every placeholder in a single pass over the template; unknown fields are left as-is
+    html_content = _TEMPLATE_PLACEHOLDER_RE.sub(lambda m: context.get(m.group(1), m.group(0)), template)
 
     with open(output_path, "w", encoding='utf-8') as f:
         f.write(html_content)
@@ -277,11 +277,12 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
     if hasattr(args, 'alpha_beta_ratios') and args.alpha_beta_ratios:
         current_alpha_beta_ratios = args.alpha_beta_ratios.copy()
         if "Default" not in current_alpha_beta_ratios:
-            from .config import templates
-            current_alpha_beta_ratios["Default"] = templates["Cervix HDR - EMBRACE II"]["alpha_beta_ratios"]["Default"]
+            current_alpha_beta_ratios["Default"] = get_template()[0]["Default"]
     else:
-        from .config import templates
-        current_alpha_beta_ratios = templates["Cervix HDR - EMBRACE II"]["alpha_beta_ratios"].copy()
+        current_alpha_beta_ratios = get_template()[0].copy()
+    # Organs without their own ratio fall back to Default; the defaultdict resolves that with a single lookup
+    default_alpha_beta = current_alpha_beta_ratios["Default"]
+    current_alpha_beta_ratios = defaultdict(lambda: default_alpha_beta, current_alpha_beta_ratios)
 
     point_dose_results = []
 
@@ -291,7 +292,7 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
         if isinstance(args.previous_brachy_data, str): # HTML path
             previous_brachy_eqd2_per_organ = parse_html_report(args.previous_brachy_data)
             for organ, eqd2 in previous_brachy_eqd2_per_organ.items():
-                alpha_beta = current_alpha_beta_ratios.get(organ, current_alpha_beta_ratios["Default"])
+                alpha_beta = current_alpha_beta_ratios[organ]
                 previous_brachy_bed_per_organ[organ] = eqd2 * (1 + (2 / alpha_beta))
 
         elif isinstance(args.previous_brachy_data, dict): # JSON fractional dose data
@@ -301,7 +302,7 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
                 if organ not in previous_brachy_bed_per_organ:
                     previous_brachy_bed_per_organ[organ] = {}
                 
-                alpha_beta = current_alpha_beta_ratios.get(organ, current_alpha_beta_ratios["Default"])
+                alpha_beta = current_alpha_beta_ratios[organ]
                 
                 for metric, dose_list in dose_fx_data.items():
                     # The metric from JSON is like 'd2cc_gy_per_fraction', we want 'd2cc'
@@ -315,7 +316,7 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
 
             # Point dose results from previous JSON
             for point_name, dose_list in args.previous_brachy_data.get('point_dose_results', {}).items():
-                alpha_beta = current_alpha_beta_ratios.get(point_name, current_alpha_beta_ratios["Default"])
+                alpha_beta = current_alpha_beta_ratios[point_name]
                 total_point_bed = 0
                 if isinstance(dose_list, list):
                     for dose_fx in dose_list:
@@ -327,6 +328,9 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
     struct_dir = next((d for d in Path(args.data_dir).iterdir() if d.is_dir() and "RTst" in d.name), None)
     dose_file = find_dicom_file(dose_dir)
     struct_file = find_dicom_file(struct_dir)
+    # The dose and structure files are independent I/O-bound reads, so load them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rt_dose_dataset, rt_struct_dataset = executor.map(load_dicom_file, [dose_file, struct_file])
 
     planned_number_of_fractions = plan_data.get('number_of_fractions', 1)
     number_of_fractions_for_calc = planned_number_of_fractions
@@ -335,49 +339,56 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
         number_of_fractions_for_calc = num_fractions_delivered
 
     dvh_results = get_dvh(
-        struct_file, dose_file, structure_data, number_of_fractions_for_calc,
+        rt_struct_dataset, rt_dose_dataset, structure_data, number_of_fractions_for_calc,
         ebrt_dose=args.ebrt_dose,
         ebrt_fractions=ebrt_fractions,
         previous_brachy_bed_per_organ=previous_brachy_bed_per_organ,
         alpha_beta_ratios=current_alpha_beta_ratios
     )
 
-    for organ, data in dvh_results.items():
-        dose_metrics = {
-            'd2cc': 'd2cc_gy_per_fraction',
-            'd1cc': 'd1cc_gy_per_fraction',
-            'd0_1cc': 'd0_1cc_gy_per_fraction',
-            'd90': 'd90_gy_per_fraction',
-            'd98': 'd98_gy_per_fraction',
-            'd95': 'd95_gy_per_fraction',
-            'max': 'max_dose_gy_per_fraction',
-            'mean': 'mean_dose_gy_per_fraction',
-            'min': 'min_dose_gy_per_fraction',
-        }
-        for metric_key, dose_key in dose_metrics.items():
-            dose_per_fraction = data.get(dose_key, 0)
-            total_dose = dose_per_fraction * number_of_fractions_for_calc
-            
-            previous_brachy_bed = 0
-            if confirmed_structure_mapping and organ in confirmed_structure_mapping:
-                json_organ = confirmed_structure_mapping[organ]
-                if json_organ in previous_brachy_bed_per_organ and isinstance(previous_brachy_bed_per_organ[json_organ], dict):
-                    previous_brachy_bed = previous_brachy_bed_per_organ[json_organ].get(metric_key, 0)
-            elif organ in previous_brachy_bed_per_organ and isinstance(previous_brachy_bed_per_organ[organ], dict):
-                previous_brachy_bed = previous_brachy_bed_per_organ[organ].get(metric_key, 0)
-
-            total_bed, eqd2, bed_brachy, _, _ = calculate_bed_and_eqd2(
-                total_dose,
-                dose_per_fraction,
-                organ,
-                args.ebrt_dose,
-                ebrt_fractions,
-                previous_brachy_bed,
-                current_alpha_beta_ratios
-            )
-            data[f'bed_{metric_key}'] = total_bed
-            data[f'eqd2_{metric_key}'] = eqd2
-            data[f'bed_brachy_{metric_key}'] = bed_brachy
+    dose_metrics = {
+        'd2cc': 'd2cc_gy_per_fraction',
+        'd1cc': 'd1cc_gy_per_fraction',
+        'd0_1cc': 'd0_1cc_gy_per_fraction',
+        'd90': 'd90_gy_per_fraction',
+        'd98': 'd98_gy_per_fraction',
+        'd95': 'd95_gy_per_fraction',
+        'max': 'max_dose_gy_per_fraction',
+        'mean': 'mean_dose_gy_per_fraction',
+        'min': 'min_dose_gy_per_fraction',
+    }
+    organs = list(dvh_results.keys())
+    dose_per_fraction_matrix = []
+    previous_brachy_bed_matrix = []
+    for organ in organs:
+        data = dvh_results[organ]
+        dose_per_fraction_matrix.append([data.get(dose_key, 0) for dose_key in dose_metrics.values()])
+
+        previous_organ_bed = {}
+        if confirmed_structure_mapping and organ in confirmed_structure_mapping:
+            json_organ = confirmed_structure_mapping[organ]
+            if json_organ in previous_brachy_bed_per_organ and isinstance(previous_brachy_bed_per_organ[json_organ], dict):
+                previous_organ_bed = previous_brachy_bed_per_organ[json_organ]
+        elif organ in previous_brachy_bed_per_organ and isinstance(previous_brachy_bed_per_organ[organ], dict):
+            previous_organ_bed = previous_brachy_bed_per_organ[organ]
+        previous_brachy_bed_matrix.append([previous_organ_bed.get(metric_key, 0) for metric_key in dose_metrics])
+
+    if organs:
+        # All organs and metrics in one vectorized BED/EQD2 pass
+        total_bed, eqd2, bed_brachy, _, _ = calculate_bed_and_eqd2_batch(
+            dose_per_fraction_matrix,
+            number_of_fractions_for_calc,
+            organs,
+            args.ebrt_dose,
+            previous_brachy_bed_matrix,
+            current_alpha_beta_ratios
+        )
+        for i, organ in enumerate(organs):
+            data = dvh_results[organ]
+            for j, metric_key in enumerate(dose_metrics):
+                data[f'bed_{metric_key}'] = float(total_bed[i, j])
+                data[f'eqd2_{metric_key}'] = float(eqd2[i, j])
+                data[f'bed_brachy_{metric_key}'] = float(bed_brachy[i, j])
 
 
     current_target_constraints = custom_constraints.get("constraints", {}).get("target_constraints") if custom_constraints else None
@@ -390,17 +401,22 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
     else:
         filtered_dose_references = plan_data.get('dose_references', [])
 
-    for dr in filtered_dose_references:
-        total_bed, eqd2, bed_brachy, bed_ebrt, bed_previous_brachy = calculate_point_dose_bed_eqd2(
-            dr['dose'], number_of_fractions_for_calc, dr['name'], args.ebrt_dose, ebrt_fractions,
-            previous_brachy_bed=previous_brachy_bed_per_organ.get(dr['name'], 0),
-            alpha_beta_ratios=current_alpha_beta_ratios
+    if filtered_dose_references:
+        # All dose points in one vectorized BED/EQD2 pass, one row per point
+        total_bed, eqd2, bed_brachy, bed_ebrt, bed_previous_brachy = calculate_bed_and_eqd2_batch(
+            [[dr['dose']] for dr in filtered_dose_references],
+            number_of_fractions_for_calc,
+            [dr['name'] for dr in filtered_dose_references],
+            args.ebrt_dose,
+            [[previous_brachy_bed_per_organ.get(dr['name'], 0)] for dr in filtered_dose_references],
+            current_alpha_beta_ratios
         )
-        point_dose_results.append({
-            'name': dr['name'], 'dose': dr['dose'], 'total_dose': dr['dose'] * number_of_fractions_for_calc,
-            'BED_this_plan': bed_brachy, 'BED_previous_brachy': bed_previous_brachy,
-            'BED_EBRT': bed_ebrt, 'EQD2': eqd2,
-        })
+        for i, dr in enumerate(filtered_dose_references):
+            point_dose_results.append({
+                'name': dr['name'], 'dose': dr['dose'], 'total_dose': dr['dose'] * number_of_fractions_for_calc,
+                'BED_this_plan': float(bed_brachy[i, 0]), 'BED_previous_brachy': float(bed_previous_brachy[i, 0]),
+                'BED_EBRT': float(bed_ebrt[i, 0]), 'EQD2': float(eqd2[i, 0]),
+            })
 
     constraint_evaluation = evaluate_constraints(dvh_results, point_dose_results, target_constraints=current_target_constraints, oar_constraints=current_oar_constraints, point_dose_constraints=point_dose_constraints, dose_point_mapping=dose_point_mapping)
 
@@ -469,8 +485,6 @@ def main(args, structure_data, plan_data, selected_point_names=None, custom_cons
 
     plan_time_warning = check_plan_time(plan_data.get('plan_time'))
 
-    rt_dose_dataset = load_dicom_file(dose_file)
-
     output_data = {
         "patient_name": str(rt_dose_dataset.PatientName),
         "patient_mrn": str(rt_dose_dataset.PatientID),
@@ -544,12 +558,13 @@ def generate_dwell_time_sheet(mosaiq_schedule_path, rtplan_file, output_excel_pa
     patient_mrn = "N/A"
     plan_name = "N/A"
     plan_date_str = "N/A"
+    rtplan_dataset = None
 
     if rtplan_file:
-        rtplan_dataset = pydicom.dcmread(rtplan_file)
+        rtplan_dataset = read_dicom_dataset(rtplan_file)
         patient_name = str(rtplan_dataset.PatientName)
         patient_mrn = str(rtplan_dataset.PatientID)
-        plan_data = get_plan_data(rtplan_file)
+        plan_data = get_plan_data(rtplan_dataset)
         plan_name = plan_data.get('plan_name', 'N/A')
         source_strength_ref_date = plan_data.get('source_strength_ref_date', 'N/A')
         source_strength_ref_time = plan_data.get('source_strength_ref_time', 'N/A')
@@ -587,7 +602,7 @@ def generate_dwell_time_sheet(mosaiq_schedule_path, rtplan_file, output_excel_pa
         
         ws['B13'] = source_activity_ci
         
-        dwell_data = get_dwell_times_and_positions(rtplan_file)
+        dwell_data = get_dwell_times_and_positions(rtplan_dataset)
         
         # Create a map of Excel position to dwell time based on the user's mapping
         excel_dwell_map = {300 - int(item['position']): item['dwell_time'] for item in dwell_data}
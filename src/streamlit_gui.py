@@ -12,7 +12,7 @@ sys.path.insert(0, project_root)
 
 from src.dicom_parser import get_plan_data, get_dose_point_mapping
 from src.main import main as run_analysis, convert_html_to_pdf
-from src.config import templates
+from src.config import templates, thaw
 import tempfile
 
 def main():
@@ -98,7 +98,7 @@ def main():
         for uploaded_file in uploaded_files:
             try:
                 uploaded_file.seek(0)
-                ds = pydicom.dcmread(uploaded_file, stop_before_pixels=True)
+                ds = pydicom.dcmread(uploaded_file, stop_before_pixels=True, specific_tags=['SOPClassUID'])
                 sop_class_uid = ds.SOPClassUID
                 if sop_class_uid == '1.2.840.10008.5.1.4.1.1.481.5':
                     rtplan_count += 1
@@ -129,7 +129,7 @@ def main():
     def on_template_change():
         st.session_state.current_template_name = st.session_state.template_selector
         st.session_state.ab_ratios = templates[st.session_state.current_template_name]["alpha_beta_ratios"].copy()
-        st.session_state.custom_constraints = templates[st.session_state.current_template_name]["constraints"].copy()
+        st.session_state.custom_constraints = thaw(templates[st.session_state.current_template_name]["constraints"])
         st.session_state.widget_key_suffix = st.session_state.get('widget_key_suffix', 0) + 1
         if 'manual_mapping' in st.session_state:
             del st.session_state['manual_mapping']
@@ -149,7 +149,7 @@ def main():
     if "ab_ratios" not in st.session_state:
         st.session_state.ab_ratios = templates[st.session_state.current_template_name]["alpha_beta_ratios"].copy()
     if "custom_constraints" not in st.session_state:
-        st.session_state.custom_constraints = templates[st.session_state.current_template_name]["constraints"].copy()
+        st.session_state.custom_constraints = thaw(templates[st.session_state.current_template_name]["constraints"])
 
     # Initialize selected_point_names and available_point_names in session state at the top
     if 'available_point_names' not in st.session_state:
@@ -187,7 +187,7 @@ def main():
 
             # Reset constraints button
             if st.button("Reset Constraints to Template Defaults"):
-                st.session_state.custom_constraints = templates[st.session_state.current_template_name]["constraints"].copy()
+                st.session_state.custom_constraints = thaw(templates[st.session_state.current_template_name]["constraints"])
                 st.session_state.widget_key_suffix = st.session_state.get('widget_key_suffix', 0) + 1 # Force re-render
 
             # Separate constraints into target and OAR
@@ -277,7 +277,7 @@ def main():
             try:
                 first_file = uploaded_files[0]
                 first_file.seek(0)
-                ds = pydicom.dcmread(first_file, stop_before_pixels=True)
+                ds = pydicom.dcmread(first_file, stop_before_pixels=True, specific_tags=['PatientName', 'PatientID'])
                 st.session_state['patient_info'] = {
                     "name": str(ds.PatientName),
                     "mrn": str(ds.PatientID)
@@ -395,7 +395,7 @@ def main():
                 try:
                     # Use seek(0) to ensure we read from the beginning
                     uploaded_file.seek(0)
-                    ds = pydicom.dcmread(uploaded_file, stop_before_pixels=True)
+                    ds = pydicom.dcmread(uploaded_file, stop_before_pixels=True, specific_tags=['SOPClassUID', 'FractionGroupSequence'])
 
                     if ds.SOPClassUID == '1.2.840.10008.5.1.4.1.1.481.5': # RT Plan Storage
                         if hasattr(ds, 'FractionGroupSequence') and ds.FractionGroupSequence:
@@ -460,7 +460,7 @@ def main():
                     f.write(uploaded_file.getbuffer())
 
                 try:
-                    ds = pydicom.dcmread(file_path)
+                    ds = pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=['SOPClassUID'])
                     if ds.SOPClassUID == '1.2.840.10008.5.1.4.1.1.481.2': # RT Dose Storage
                         os.rename(file_path, os.path.join(rtdose_dir, uploaded_file.name))
                     elif ds.SOPClassUID == '1.2.840.10008.5.1.4.1.1.481.3': # RT Structure Set Storage
@@ -528,7 +528,8 @@ def main():
 
             if rtstruct_file_path:
                 from src.dicom_parser import get_structure_data, load_dicom_file
-                rtstruct_dataset = load_dicom_file(rtstruct_file_path)
+                # Only the structure names are needed here, so skip everything but the ROI sequences
+                rtstruct_dataset = load_dicom_file(rtstruct_file_path, specific_tags=['ROIContourSequence', 'StructureSetROISequence'])
                 structure_data = get_structure_data(rtstruct_dataset)
                 structure_names = list(structure_data.keys())
 
@@ -589,7 +590,7 @@ def main():
                     file_path = os.path.join(tmpdir, uploaded_file.name)
                     with open(file_path, "wb") as f:
                         f.write(uploaded_file.getbuffer())
-                    ds = pydicom.dcmread(file_path)
+                    ds = pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=['SOPClassUID'])
                     if ds.SOPClassUID == '1.2.840.10008.5.1.4.1.1.481.5': # RT Plan Storage
                         rtplan_file_path = file_path
 
@@ -654,7 +655,7 @@ def main():
                     f.write(uploaded_file.getbuffer())
 
                 try:
-                    ds = pydicom.dcmread(file_path)
+                    ds = pydicom.dcmread(file_path, stop_before_pixels=True, specific_tags=['SOPClassUID'])
                     if ds.SOPClassUID == '1.2.840.10008.5.1.4.1.1.481.2':
                         rtdose_path = os.path.join(rtdose_dir_analysis, uploaded_file.name)
                         os.rename(file_path, rtdose_path)
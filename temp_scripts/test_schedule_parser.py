@@ -7,7 +7,7 @@ from pathlib import Path
 # Add the src directory to the Python path
 sys.path.append(str(Path(__file__).parent.parent / 'src'))
 
-from dicom_parser import get_dicom_files, sort_dicom_files, get_plan_data
+from dicom_parser import get_dicom_files, read_dicom_headers, sort_dicom_files, get_plan_data
 import pydicom
 
 # --- Helper Function ---
@@ -71,7 +71,7 @@ def main():
     # --- Parse DICOM data ---
     print("\n2. Parsing DICOM data...")
     dicom_files = get_dicom_files(dicom_dir)
-    sorted_files = sort_dicom_files(dicom_files)
+    sorted_files = sort_dicom_files(read_dicom_headers(dicom_files))
     rtplan_file = sorted_files.get("RTPLAN")
     patient_name = "N/A"
     patient_mrn = "N/A"
@@ -70,7 +70,7 @@ def main():
 
     # We need to load the RTSTRUCT dataset to pass to calculate_contour_volumes
     rt_struct_dataset = pydicom.dcmread(rtstruct_file)
-    calculated_volumes = calculate_contour_volumes(rtstruct_file, rt_struct_dataset)
+    calculated_volumes = calculate_contour_volumes(rt_struct_dataset, {})
     expected_volumes = get_expected_volumes(excel_file)
 
     print("--- Contour Volume Comparison ---")